@@ -1,24 +1,49 @@
 #!/usr/bin/env python3
 """
 Script to transfer files from Amazon S3 to Backblaze B2
-Requires: pip install boto3 b2sdk python-dotenv
+Requires: pip install boto3[crt] b2sdk python-dotenv
 """
 
+import atexit
+import io
+import json
 import os
+import queue
 import sys
 import hashlib
+import threading
 import time
 import logging
-from typing import Optional, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
 
 import boto3
+import requests
+from botocore.compat import HAS_CRT
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError, NoCredentialsError
-from b2sdk.v2 import B2Api, InMemoryAccountInfo
-from b2sdk.v2.exception import B2Error
+from botocore.httpchecksum import StreamingChecksumBody
+from requests.adapters import HTTPAdapter
+from b2sdk.v2 import B2Api, B2HttpApiConfig, Bucket, FileVersion, InMemoryAccountInfo
+from b2sdk.v2.exception import B2Error, MaxRetriesExceeded
 from dotenv import load_dotenv
 
+MB = 1024 * 1024
+GB = 1024 * MB
+B2_MAX_PARTS = 10000  # B2 large files are limited to 10,000 parts
+B2_MIN_PART_SIZE = 5 * MB  # Smallest part B2 accepts, other than the last part of a file
+HUGE_OBJECT_SIZE = 5 * GB  # Objects at least this large are uploaded in bigger parts...
+HUGE_OBJECT_PART_SIZE = 100 * MB  # ...of at least this size, to cut the number of part uploads
+MAX_UPLOAD_ATTEMPTS = 5  # Attempts per B2 part upload, matching b2sdk's own UploadManager
+STREAM_READ_SIZE = 1 * MB  # Read (and hash) streamed bodies in large blocks
+LIST_SHARD_WORKERS = 16  # Maximum number of prefix shards listed concurrently
+S3_DELETE_BATCH_SIZE = 1000  # DeleteObjects accepts up to 1,000 keys per request
+S3_ARCHIVE_STORAGE_CLASSES = ("GLACIER", "DEEP_ARCHIVE")  # Must be restored before they can be read
+S3_CHECKSUM_ALGORITHMS = ("CRC64NVME", "CRC32C", "CRC32", "SHA256", "SHA1")
 
 # Configuration
 @dataclass
@@ -33,6 +58,9 @@ class TransferConfig:
 
     # S3 optional/defaults
     s3_prefix: str = ""  # Optional prefix to filter objects
+    s3_prefix_is_directory: bool = False  # Treat the prefix as a folder and ensure it ends with "/"
+    list_shards: List[str] = field(default_factory=list)  # Sub-prefixes to list in parallel, e.g. ["0", ..., "f"]
+    auto_shard_listing: bool = False  # List each "subfolder" of the prefix in parallel
     aws_access_key_id: Optional[str] = None  # If None, uses default AWS credentials
     aws_secret_access_key: Optional[str] = None
     aws_region: str = "us-east-1"
@@ -42,6 +70,86 @@ class TransferConfig:
     max_workers: int = 5  # Number of concurrent transfers
     verify_checksums: bool = True  # Verify file integrity after transfer
     skip_existing: bool = True  # Skip files that already exist in B2
+    listing_cache_ttl: int = 0  # Seconds to reuse a cached S3 listing across runs (0 disables the cache)
+    log_level: str = "INFO"  # Set to DEBUG to log the progress of each file
+    prefer_server_side_copy: bool = False  # Copy within B2 when identical content is already there
+
+    # Large object options
+    multipart_threshold: int = 64 * MB  # Objects larger than this are fetched with parallel range GETs
+    multipart_chunksize: int = 16 * MB  # Size of each range GET / B2 part
+    part_workers: int = 8  # Number of concurrent range GETs per transfer worker
+
+
+def etag_md5(s3_etag: str) -> Optional[bytes]:
+    """Return the MD5 digest held in a single-part S3 ETag, or None if the ETag isn't a plain MD5"""
+    # Multipart ETags ("<md5>-<parts>") are not an MD5 of the content and can't be compared
+    if "-" in s3_etag:
+        return None
+    try:
+        digest = bytes.fromhex(s3_etag)
+    except ValueError:
+        return None
+    return digest if len(digest) == 16 else None
+
+
+def s3_checksum_info(response: dict) -> Dict[str, str]:
+    """Return the checksums S3 stored for an object, as B2 file info entries"""
+    return {
+        f"s3_checksum_{algorithm.lower()}": response[f"Checksum{algorithm}"]
+        for algorithm in S3_CHECKSUM_ALGORITHMS
+        if f"Checksum{algorithm}" in response
+    }
+
+
+class HashingStream:
+    """Read-only file-like wrapper that hashes an S3 response body as it is consumed"""
+
+    def __init__(self, body, hasher=None):
+        self.body = body
+        self.hasher = hasher
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.body.read(size if size >= 0 else None)
+        if self.hasher is not None:
+            self.hasher.update(chunk)
+        return chunk
+
+
+class ByteBudget:
+    """Semaphore counted in bytes, bounding how much part data is held in memory at once"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, size: int):
+        # A request larger than the whole budget is let through once nothing else is held
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_use == 0 or self.in_use + size <= self.capacity)
+            self.in_use += size
+
+    def release(self, size: int):
+        with self.condition:
+            self.in_use -= size
+            self.condition.notify_all()
+
+
+def directory_prefix(prefix: str, is_directory: bool) -> str:
+    """Return the S3 prefix to list, with a trailing "/" if it names a directory"""
+    # S3 lists a "/"-terminated prefix much faster than an arbitrary key prefix
+    if is_directory and prefix and not prefix.endswith("/"):
+        return prefix + "/"
+    return prefix
+
+
+def _b2_http_session(pool_size: int) -> requests.Session:
+    """Create an HTTP session for b2sdk with a connection pool large enough for all workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 class S3ToB2Transfer:
@@ -49,71 +157,431 @@ class S3ToB2Transfer:
         self.config = config
         self.logger = self._setup_logging()
 
-        # Initialize S3 client
-        try:
-            if config.aws_access_key_id and config.aws_secret_access_key:
-                self.s3_client = boto3.client(
-                    "s3",
-                    aws_access_key_id=config.aws_access_key_id,
-                    aws_secret_access_key=config.aws_secret_access_key,
-                    region_name=config.aws_region,
-                )
-            else:
-                self.s3_client = boto3.client("s3", region_name=config.aws_region)
-        except NoCredentialsError:
-            self.logger.error("AWS credentials not found. Please configure AWS credentials.")
-            sys.exit(1)
+        self.s3_prefix = directory_prefix(config.s3_prefix, config.s3_prefix_is_directory)
+        if self.s3_prefix != config.s3_prefix:
+            self.logger.info(f"Normalized S3 prefix to '{self.s3_prefix}' for faster listing")
+
+        # Every transfer worker and range GET thread may hold a connection at the same time;
+        # size the HTTP pools for that so connections are reused rather than discarded
+        pool_size = max(config.max_workers * (config.part_workers + 1) + LIST_SHARD_WORKERS, 50)
+
+        # Creating the S3 client (loading botocore models) and authorizing with B2 are independent,
+        # so run them concurrently; the B2 listing below also overlaps with the S3 client setup
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            s3_future = executor.submit(self._create_s3_client, pool_size)
+            b2_future = executor.submit(self._connect_b2, pool_size)
+
+            # Initialize B2 API
+            try:
+                self.b2_api, self.b2_bucket = b2_future.result()
+            except B2Error as e:
+                self.logger.error(f"Failed to connect to B2: {e}")
+                sys.exit(1)
+
+            # Fetch the existing B2 files once so skip checks are local lookups, and index them by
+            # S3 ETag and size so duplicate content can be copied server-side within B2
+            self.b2_files: Dict[str, str] = {}  # file name -> S3 ETag it was transferred from ("" if unknown)
+            self.b2_copy_sources: Dict[Tuple[str, int], str] = {}
+            if config.skip_existing or config.prefer_server_side_copy:
+                try:
+                    for file_version in self.list_b2_files():
+                        s3_etag = file_version.file_info.get("s3_etag", "")
+                        self.b2_files[file_version.file_name] = s3_etag
+                        if s3_etag and config.prefer_server_side_copy:
+                            self.b2_copy_sources[(s3_etag, file_version.size)] = file_version.id_
+                except B2Error as e:
+                    self.logger.error(f"Failed to list existing files in B2: {e}")
+                    sys.exit(1)
+                self.logger.info(f"Found {len(self.b2_files)} existing files in B2")
+
+            # Initialize S3 client
+            try:
+                self.s3_client = s3_future.result()
+            except NoCredentialsError:
+                self.logger.error("AWS credentials not found. Please configure AWS credentials.")
+                sys.exit(1)
+
+        # With awscrt installed (boto3[crt]), botocore signs requests and computes CRC checksums in C
+        if HAS_CRT:
+            self.logger.info("Using the AWS Common Runtime for S3 request signing and checksums")
+        else:
+            self.logger.info("awscrt not installed; install boto3[crt] for faster S3 request signing and checksums")
+
+        # Set when the S3 listing stops early, so a partial run isn't reported as complete
+        self.listing_failed = False
+
+        # Keys transferred in move mode, waiting to be deleted from S3 in batches
+        self.delete_queue: "queue.Queue[str]" = queue.Queue()
+
+        # Range GETs for large objects share one long-lived pool instead of spinning up threads per object
+        self.part_executor = ThreadPoolExecutor(
+            max_workers=config.max_workers * config.part_workers, thread_name_prefix="s3tob2-part"
+        )
 
-        # Initialize B2 API
-        try:
-            # Use InMemoryAccountInfo from the correct module
-            info = InMemoryAccountInfo()
-            self.b2_api = B2Api(account_info=info) # type: ignore
-            self.b2_api.authorize_account("production", config.b2_application_key_id, config.b2_application_key)
-            self.b2_bucket = self.b2_api.get_bucket_by_name(config.b2_bucket)
-        except B2Error as e:
-            self.logger.error(f"Failed to connect to B2: {e}")
-            sys.exit(1)
+        # Huge objects use parts far larger than MULTIPART_CHUNKSIZE_MB; cap the part data in flight
+        # at what a full pool of ordinary parts would hold, so fewer huge parts run at once
+        self.part_budget = ByteBudget(config.max_workers * config.part_workers * config.multipart_chunksize)
+
+    def _create_s3_client(self, pool_size: int):
+        """Create the S3 client with a connection pool sized for all worker threads"""
+        s3_config = BotoConfig(
+            max_pool_connections=pool_size,
+            tcp_keepalive=True,
+            retries={"mode": "adaptive", "max_attempts": 10},
+        )
+        # An explicit session resolves credentials once; boto3's module-level default session
+        # isn't thread-safe and may repeat credential-chain lookups
+        if self.config.aws_access_key_id and self.config.aws_secret_access_key:
+            self.s3_session = boto3.session.Session(
+                aws_access_key_id=self.config.aws_access_key_id,
+                aws_secret_access_key=self.config.aws_secret_access_key,
+                region_name=self.config.aws_region,
+            )
+        else:
+            self.s3_session = boto3.session.Session(region_name=self.config.aws_region)
+        return self.s3_session.client("s3", config=s3_config)
+
+    def _connect_b2(self, pool_size: int) -> Tuple[B2Api, Bucket]:
+        """Authorize with B2 and look up the destination bucket"""
+        # Use InMemoryAccountInfo from the correct module
+        info = InMemoryAccountInfo()
+        # b2sdk uploads stream parts on its own thread pool, which defaults to 10 threads
+        # and would otherwise cap throughput below MAX_WORKERS
+        b2_api = B2Api(
+            account_info=info, # type: ignore
+            max_upload_workers=max(self.config.max_workers, 10),
+            # b2sdk only keeps a custom session's adapters when decode_content is set;
+            # it has no effect here since this script never downloads from B2
+            api_config=B2HttpApiConfig(
+                http_session_factory=partial(_b2_http_session, pool_size), decode_content=True
+            ),
+        )
+        b2_api.authorize_account("production", self.config.b2_application_key_id, self.config.b2_application_key)
+        return b2_api, b2_api.get_bucket_by_name(self.config.b2_bucket)
 
     def _setup_logging(self) -> logging.Logger:
         """Set up logging configuration"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
-            handlers=[logging.FileHandler("s3_to_b2_transfer.log"), logging.StreamHandler(sys.stdout)],
+        # Worker threads only enqueue records; timestamp formatting and file/console I/O
+        # happen on the listener thread, off the transfer path
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        handlers = [logging.FileHandler("s3_to_b2_transfer.log"), logging.StreamHandler(sys.stdout)]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        listener = QueueListener(log_queue, *handlers)
+        listener.start()
+        atexit.register(listener.stop)
+
+        # Attached directly rather than through basicConfig, which would give the queue handler
+        # its own "LEVEL:name:" format on top of the listener's; like basicConfig, leave an
+        # already configured root logger alone
+        root_logger = logging.getLogger()
+        if not root_logger.handlers:
+            root_logger.setLevel(logging.INFO)
+            root_logger.addHandler(QueueHandler(log_queue))
+        logger = logging.getLogger(__name__)
+        # Per-file progress is logged at DEBUG; LOG_LEVEL=DEBUG shows it without enabling library debug logs
+        logger.setLevel(self.config.log_level.upper())
+        return logger
+
+    def _list_pages(self, prefix: str, **kwargs) -> Iterator[dict]:
+        """Yield ListObjectsV2 pages for a prefix"""
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+
+        # RestoreStatus lets archived objects be recognised from the listing alone
+        yield from paginator.paginate(
+            Bucket=self.config.s3_bucket,
+            Prefix=prefix,
+            OptionalObjectAttributes=["RestoreStatus"],
+            **kwargs,
         )
-        return logging.getLogger(__name__)
 
-    def list_s3_objects(self) -> List[dict]:
-        """List all objects in the S3 bucket with the specified prefix"""
-        objects = []
-        paginator = self.s3_client.get_paginator("list_objects_v2")
+    def _list_shards_in_parallel(self, shards: List[str]) -> Iterator[dict]:
+        """Yield objects under several prefixes, listing each one on its own thread"""
+        pages: "queue.Queue[object]" = queue.Queue(maxsize=2 * LIST_SHARD_WORKERS)
+        stop = threading.Event()
+        shard_done = object()
+
+        def put(item: object) -> None:
+            # Give up once the consumer has gone away, rather than blocking on a full queue forever
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    continue
+
+        def list_shard(shard: str) -> None:
+            try:
+                for page in self._list_pages(shard):
+                    if stop.is_set():
+                        return
+                    put(page.get("Contents", []))
+            except Exception as e:
+                put(e)
+            finally:
+                put(shard_done)
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(len(shards), LIST_SHARD_WORKERS), thread_name_prefix="s3tob2-list"
+        )
+        for shard in shards:
+            executor.submit(list_shard, shard)
+
+        try:
+            remaining = len(shards)
+            while remaining:
+                item = pages.get()
+                if item is shard_done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            stop.set()
+            executor.shutdown(cancel_futures=True)
+
+    def _paginate_s3_objects(self) -> Iterator[dict]:
+        """Yield objects under the S3 prefix straight from ListObjectsV2, fanning out across shards if configured"""
+        prefix = self.s3_prefix
+        if self.config.list_shards:
+            shards = [prefix + shard for shard in self.config.list_shards]
+        elif self.config.auto_shard_listing:
+            # Probe one level down: objects directly under the prefix are returned here and
+            # each "subfolder" becomes a shard that is listed in full
+            shards = []
+            for page in self._list_pages(prefix, Delimiter="/"):
+                yield from page.get("Contents", [])
+                shards.extend(common_prefix["Prefix"] for common_prefix in page.get("CommonPrefixes", []))
+        else:
+            for page in self._list_pages(prefix):
+                yield from page.get("Contents", [])
+            return
+
+        if shards:
+            self.logger.info(f"Listing {len(shards)} S3 prefix shards in parallel")
+            yield from self._list_shards_in_parallel(shards)
+
+    def _listing_cache_path(self) -> Path:
+        """Return the file used to cache the S3 listing for this bucket, prefix and shard settings"""
+        cache_dir = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "s3tob2"
+        # Explicit shards list only part of the prefix, so a listing is only reused with the same shards
+        listing_key = json.dumps([self.s3_prefix, self.config.list_shards, self.config.auto_shard_listing])
+        listing_hash = hashlib.sha1(listing_key.encode(), usedforsecurity=False).hexdigest()[:16]
+        return cache_dir / f"{self.config.s3_bucket}-{listing_hash}.jsonl"
+
+    def _cached_s3_objects(self) -> Iterator[dict]:
+        """Yield objects from a cached S3 listing if it is recent enough, otherwise list and cache them"""
+        cache_path = self._listing_cache_path()
+        try:
+            if cache_path.exists() and time.time() - cache_path.stat().st_mtime < self.config.listing_cache_ttl:
+                cache_file = cache_path.open()
+            else:
+                cache_file = None
+        except OSError as e:
+            self.logger.warning(f"Can't read the S3 listing cache, listing S3 instead: {e}")
+            cache_file = None
+        if cache_file is not None:
+            self.logger.info(f"Using cached S3 listing from {cache_path}")
+            with cache_file:
+                for line in cache_file:
+                    yield json.loads(line)
+            return
 
+        # Write one object per line as the listing streams by, and only replace the cache
+        # once the listing has completed. The cache is optional, so a failure to write it
+        # only stops caching; the listing itself carries on.
+        partial_path = cache_path.with_suffix(".partial")
         try:
-            for page in paginator.paginate(Bucket=self.config.s3_bucket, Prefix=self.config.s3_prefix):
-                if "Contents" in page:
-                    objects.extend(page["Contents"])
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_file = partial_path.open("w")
+        except OSError as e:
+            self.logger.warning(f"Can't write the S3 listing cache, listing without it: {e}")
+            yield from self._paginate_s3_objects()
+            return
+
+        caching = True
+        try:
+            for obj in self._paginate_s3_objects():
+                if caching:
+                    try:
+                        cache_file.write(json.dumps(obj, default=str) + "\n")
+                    except OSError as e:
+                        self.logger.warning(f"Can't write the S3 listing cache, listing without it: {e}")
+                        caching = False
+                yield obj
+        finally:
+            try:
+                cache_file.close()
+            except OSError:
+                caching = False
+
+        if caching:
+            try:
+                os.replace(partial_path, cache_path)
+            except OSError as e:
+                self.logger.warning(f"Can't save the S3 listing cache: {e}")
+
+    def list_s3_objects(self) -> Iterator[dict]:
+        """Yield objects in the S3 bucket with the specified prefix, one listing page at a time"""
+        # Objects deleted by a move would still be in the cached listing, so only copies use it
+        use_cache = self.config.listing_cache_ttl > 0 and not self.config.delete_from_s3
+
+        try:
+            yield from self._cached_s3_objects() if use_cache else self._paginate_s3_objects()
         except ClientError as e:
             self.logger.error(f"Error listing S3 objects: {e}")
-            return []
+            self.listing_failed = True
+
+    def list_b2_files(self) -> Iterator[FileVersion]:
+        """List the latest version of all files in the B2 bucket under the S3 prefix"""
+        prefix = self.s3_prefix
+        # b2sdk lists folders, so a raw key prefix is listed from its parent folder and filtered
+        folder = prefix if prefix.endswith("/") else prefix.rpartition("/")[0]
+        for file_version, _ in self.b2_bucket.ls(folder, latest_only=True, recursive=True):
+            if file_version.file_name.startswith(prefix):
+                yield file_version
+
+    def file_exists_in_b2(self, key: str, s3_etag: str) -> bool:
+        """Check if an up-to-date copy of a file already exists in B2"""
+        if not self.config.skip_existing or key not in self.b2_files:
+            return False
 
-        self.logger.info(f"Found {len(objects)} objects in S3 bucket")
-        return objects
+        # Files not written by this script carry no S3 ETag and are assumed to be current
+        b2_etag = self.b2_files[key]
+        return not b2_etag or b2_etag == s3_etag
 
-    def file_exists_in_b2(self, key: str) -> bool:
-        """Check if a file already exists in B2"""
-        if not self.config.skip_existing:
-            return False
+    def copy_within_b2(self, key: str, size: int, s3_etag: str, source_file_id: str) -> bool:
+        """Create a file in B2 as a server-side copy of an existing file with the same content"""
+        # The copy gets this object's own Content-Type and metadata rather than inheriting the source file's
+        response = self.s3_client.head_object(Bucket=self.config.s3_bucket, Key=key, ChecksumMode="ENABLED")
+        file_info = {"src": "s3", "s3_etag": s3_etag, "transferred_at": str(int(time.time()))}
+        file_info.update(s3_checksum_info(response))
 
         try:
-            file_info = self.b2_bucket.get_file_info_by_name(key)
-            return file_info is not None
-        except B2Error:
+            self.b2_bucket.copy(
+                source_file_id,
+                key,
+                content_type=response.get("ContentType", "application/octet-stream"),
+                file_info=file_info,
+                length=size,
+            )
+            return True
+        except B2Error as e:
+            self.logger.warning(f"Server-side copy failed for {key}, falling back to download/upload: {e}")
             return False
 
-    def calculate_md5(self, data: bytes) -> str:
-        """Calculate MD5 hash of data"""
-        return hashlib.md5(data).hexdigest()
+    def _part_size_for(self, size: int, default_part_size: int) -> int:
+        """Choose the B2 part size for an object, using fewer and larger parts for very large objects"""
+        if size >= HUGE_OBJECT_SIZE:
+            return max(default_part_size, -(-size // B2_MAX_PARTS), HUGE_OBJECT_PART_SIZE)
+        return default_part_size
+
+    def _download_range(
+        self, key: str, first_byte: int, last_byte: int, s3_etag: Optional[str] = None
+    ) -> Tuple[dict, bytes]:
+        """Fetch one byte range of an S3 object, returning the response metadata and the data
+
+        If s3_etag is given, S3 rejects the request with PreconditionFailed when the object
+        has been overwritten since that ETag was read.
+        """
+        kwargs = {"IfMatch": f'"{s3_etag}"'} if s3_etag else {}
+        response = self.s3_client.get_object(
+            Bucket=self.config.s3_bucket, Key=key, Range=f"bytes={first_byte}-{last_byte}", **kwargs
+        )
+        with response["Body"] as body:
+            return response, body.read()
+
+    def _upload_part(self, file_id: str, part_number: int, data: bytes) -> str:
+        """Upload data as a B2 large file part, returning its SHA1"""
+        sha1 = hashlib.sha1(data, usedforsecurity=False).hexdigest()
+
+        # Retry the way b2sdk's UploadManager does. The session only returns an upload URL to
+        # the pool after a successful upload, so each retry runs against a fresh URL.
+        exception_list = []
+        for _ in range(MAX_UPLOAD_ATTEMPTS):
+            try:
+                self.b2_api.session.upload_part(file_id, part_number, len(data), sha1, io.BytesIO(data))
+                return sha1
+            except B2Error as e:
+                if not e.should_retry_upload():
+                    raise
+                exception_list.append(e)
+        raise MaxRetriesExceeded(MAX_UPLOAD_ATTEMPTS, exception_list)
+
+    def _transfer_part(
+        self, key: str, s3_etag: str, file_id: str, part_number: int, first_byte: int, last_byte: int
+    ) -> str:
+        """Fetch one byte range from S3 and upload it as a B2 large file part, returning its SHA1"""
+        part_size = last_byte - first_byte + 1
+        self.part_budget.acquire(part_size)
+        try:
+            _, data = self._download_range(key, first_byte, last_byte, s3_etag)
+            return self._upload_part(file_id, part_number, data)
+        finally:
+            self.part_budget.release(part_size)
+
+    def _transfer_large_file(self, key: str, size: int, listed_etag: str) -> Tuple[str, str]:
+        """Transfer a large object using concurrent byte-range GETs feeding a B2 large file
+
+        Returns the B2 file ID and the S3 ETag of the object.
+        """
+        part_size = self._part_size_for(size, self.config.multipart_chunksize)
+        ranges = [(offset, min(offset + part_size, size) - 1) for offset in range(0, size, part_size)]
+
+        # The ranges are cut from the listed size, so the first range GET is pinned to the listed
+        # ETag; an object replaced since the listing fails with PreconditionFailed rather than
+        # being copied truncated. The response also carries the ContentType, saving a HEAD request.
+        # Every later range GET is pinned to the returned ETag so an object overwritten mid-transfer
+        # fails the same way instead of being stitched together from two versions.
+        response, first_part = self._download_range(key, *ranges[0], listed_etag)
+        s3_etag = response.get("ETag", "").strip('"')
+
+        # Range responses carry no full-object checksum, so fetch any stored checksums with a HEAD
+        # and record them like the streaming path does; they aren't validated against the ranges
+        file_info = {"src": "s3", "s3_etag": s3_etag, "transferred_at": str(int(time.time()))}
+        file_info.update(
+            s3_checksum_info(
+                self.s3_client.head_object(
+                    Bucket=self.config.s3_bucket, Key=key, IfMatch=f'"{s3_etag}"', ChecksumMode="ENABLED"
+                )
+            )
+        )
+
+        file_id = self.b2_api.session.start_large_file(
+            self.b2_bucket.id_,
+            key,
+            response.get("ContentType", "application/octet-stream"),
+            file_info,
+        )["fileId"]
+
+        try:
+            futures = [self.part_executor.submit(self._upload_part, file_id, 1, first_part)]
+            del first_part
+            futures += [
+                self.part_executor.submit(
+                    self._transfer_part, key, s3_etag, file_id, part_number, first_byte, last_byte
+                )
+                for part_number, (first_byte, last_byte) in enumerate(ranges[1:], start=2)
+            ]
+            try:
+                sha1_list = [future.result() for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+            self.b2_api.session.finish_large_file(file_id, sha1_list)
+        except Exception:
+            self.b2_api.session.cancel_large_file(file_id)
+            raise
+        finally:
+            # Drop the pooled part upload URLs; they are useless once the large file is closed
+            self.b2_api.account_info.clear_large_file_upload_urls(file_id)
+
+        return file_id, s3_etag
 
     def transfer_file(self, s3_object: dict) -> bool:
         """Transfer a single file from S3 to B2"""
@@ -121,40 +589,88 @@ class S3ToB2Transfer:
         size = s3_object["Size"]
 
         try:
-            # Check if file already exists in B2
-            if self.file_exists_in_b2(key):
-                self.logger.info(f"Skipping {key} (already exists in B2)")
+            # Check if file already exists in B2, using the ETag from the listing so
+            # up-to-date files are skipped without any further S3 request
+            listed_etag = s3_object.get("ETag", "").strip('"')
+            if self.file_exists_in_b2(key, listed_etag):
+                self.logger.debug(f"Skipping {key} (already exists in B2)")
                 return True
 
-            # Download from S3
-            self.logger.info(f"Downloading {key} ({size} bytes) from S3...")
-            response = self.s3_client.get_object(Bucket=self.config.s3_bucket, Key=key)
-            file_data = response["Body"].read()
-
-            # Get S3 ETag for verification (if available)
-            s3_etag = response.get("ETag", "").strip('"')
-
-            # Upload to B2
-            self.logger.info(f"Uploading {key} to B2...")
-            self.b2_bucket.upload_bytes(
-                data_bytes=file_data,
-                file_name=key,
-                content_type=response.get("ContentType", "application/octet-stream"),
-                file_info={"src": "s3", "s3_etag": s3_etag, "transferred_at": str(int(time.time()))},
-            )
-
-            # Verify checksum if enabled
-            if self.config.verify_checksums and s3_etag:
-                local_md5 = self.calculate_md5(file_data)
-                if local_md5 != s3_etag:
+            # Archived objects can't be read until they are restored; detect that from the
+            # listing rather than spending a GET request that is bound to fail
+            restore_status = s3_object.get("RestoreStatus")
+            if s3_object.get("StorageClass") in S3_ARCHIVE_STORAGE_CLASSES and (
+                not restore_status or restore_status.get("IsRestoreInProgress")
+            ):
+                storage_class = s3_object["StorageClass"]
+                self.logger.error(f"Failed to transfer {key}: object is archived in {storage_class} and not restored")
+                return False
+
+            copy_source = self.b2_copy_sources.get((listed_etag, size)) if self.config.prefer_server_side_copy else None
+            if copy_source and self.copy_within_b2(key, size, listed_etag, copy_source):
+                self.logger.debug(f"Copied {key} ({size} bytes) server-side from identical content in B2")
+            # A single-part ETag can only be verified with a sequential MD5 pass, so such
+            # objects stay on the streaming path when checksum verification is enabled
+            elif (
+                size > max(self.config.multipart_threshold, self.config.multipart_chunksize)
+                and ("-" in listed_etag or not self.config.verify_checksums)
+            ):
+                self.logger.debug(f"Transferring {key} ({size} bytes) from S3 to B2 in parallel parts...")
+                file_id, s3_etag = self._transfer_large_file(key, size, listed_etag)
+                if s3_etag and self.config.prefer_server_side_copy:
+                    self.b2_copy_sources.setdefault((s3_etag, size), file_id)
+            else:
+                # Stream from S3 straight into B2 so only a part-sized buffer is held in memory
+                self.logger.debug(f"Streaming {key} ({size} bytes) from S3 to B2...")
+                response = self.s3_client.get_object(Bucket=self.config.s3_bucket, Key=key, ChecksumMode="ENABLED")
+
+                # Get S3 ETag for verification (if available)
+                s3_etag = response.get("ETag", "").strip('"')
+
+                file_info = {"src": "s3", "s3_etag": s3_etag, "transferred_at": str(int(time.time()))}
+                file_info.update(s3_checksum_info(response))
+
+                # Objects stored with a full-object checksum are validated by botocore as the body
+                # is read; otherwise fall back to an MD5 computed on the fly and compared with the ETag
+                expected_md5 = None
+                if self.config.verify_checksums and not isinstance(response["Body"], StreamingChecksumBody):
+                    expected_md5 = etag_md5(s3_etag)
+                hasher = hashlib.new("md5", usedforsecurity=False) if expected_md5 else None
+
+                content_type = response.get("ContentType", "application/octet-stream")
+                with response["Body"] as body:
+                    stream = HashingStream(body, hasher)
+                    if size < B2_MIN_PART_SIZE:
+                        # Too small to be split into parts, so upload it in a single request
+                        file_version = self.b2_bucket.upload_bytes(
+                            stream.read(), file_name=key, content_type=content_type, file_info=file_info
+                        )
+                    else:
+                        file_version = self.b2_bucket.upload_unbound_stream(
+                            stream,
+                            file_name=key,
+                            content_type=content_type,
+                            file_info=file_info,
+                            recommended_upload_part_size=self._part_size_for(
+                                size, self.b2_api.account_info.get_recommended_part_size()
+                            ),
+                            # b2sdk reads 8 KiB at a time by default. Large reads mean far fewer Python-level
+                            # read/update calls per part, and hashlib releases the GIL while hashing each block
+                            read_size=STREAM_READ_SIZE,
+                        )
+
+                if s3_etag and self.config.prefer_server_side_copy:
+                    self.b2_copy_sources.setdefault((s3_etag, size), file_version.id_)
+
+                # Verify checksum if enabled
+                if hasher is not None and hasher.digest() != expected_md5:
                     self.logger.warning(f"Checksum mismatch for {key}")
 
-            # Delete from S3 if moving
+            # Queue for deletion from S3 if moving; transfer_all deletes in batches
             if self.config.delete_from_s3:
-                self.logger.info(f"Deleting {key} from S3...")
-                self.s3_client.delete_object(Bucket=self.config.s3_bucket, Key=key)
+                self.delete_queue.put(key)
 
-            self.logger.info(f"Successfully transferred {key}")
+            self.logger.debug(f"Successfully transferred {key}")
             return True
 
         except (ClientError, B2Error) as e:
@@ -164,43 +680,95 @@ class S3ToB2Transfer:
             self.logger.error(f"Unexpected error transferring {key}: {e}")
             return False
 
+    def _transfer_succeeded(self, future: Future, key: str) -> bool:
+        """Return whether a completed transfer task succeeded"""
+        try:
+            return future.result()
+        except Exception as e:
+            self.logger.error(f"Transfer task for {key} raised exception: {e}")
+            return False
+
+    def delete_queued_from_s3(self, flush: bool = False) -> int:
+        """Delete queued keys from S3 in full batches (or all of them if flushing), returning the failure count"""
+        failed_deletions = 0
+        while self.delete_queue.qsize() >= S3_DELETE_BATCH_SIZE or (flush and not self.delete_queue.empty()):
+            batch = []
+            while len(batch) < S3_DELETE_BATCH_SIZE and not self.delete_queue.empty():
+                batch.append(self.delete_queue.get_nowait())
+
+            self.logger.info(f"Deleting {len(batch)} objects from S3...")
+            try:
+                response = self.s3_client.delete_objects(
+                    Bucket=self.config.s3_bucket,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except ClientError as e:
+                self.logger.error(f"Failed to delete {len(batch)} objects from S3: {e}")
+                failed_deletions += len(batch)
+                continue
+
+            for error in response.get("Errors", []):
+                self.logger.error(f"Failed to delete {error['Key']} from S3: {error.get('Message', error.get('Code'))}")
+                failed_deletions += 1
+
+        return failed_deletions
+
     def transfer_all(self) -> None:
         """Transfer all files from S3 to B2"""
-        objects = self.list_s3_objects()
-        if not objects:
-            self.logger.info("No objects found to transfer")
-            return
-
+        total_objects = 0
         successful_transfers = 0
         failed_transfers = 0
+        failed_deletions = 0
 
-        self.logger.info(f"Starting transfer of {len(objects)} objects...")
+        self.logger.info("Starting transfer...")
 
-        # Use ThreadPoolExecutor for concurrent transfers
+        # Use ThreadPoolExecutor for concurrent transfers, feeding it as listing pages arrive
+        # and keeping only a bounded number of tasks queued so memory stays constant
+        max_pending = 2 * self.config.max_workers
         with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-            # Submit all transfer tasks
-            future_to_key = {executor.submit(self.transfer_file, obj): obj["Key"] for obj in objects}
-
-            # Process completed transfers
-            for future in as_completed(future_to_key):
-                key = future_to_key[future]
-                try:
-                    success = future.result()
-                    if success:
+            future_to_key: Dict[Future, str] = {}
+
+            for obj in self.list_s3_objects():
+                total_objects += 1
+                future_to_key[executor.submit(self.transfer_file, obj)] = obj["Key"]
+                if len(future_to_key) < max_pending:
+                    continue
+
+                # Wait for a slot before pulling more objects from the listing
+                done, _ = wait(future_to_key, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if self._transfer_succeeded(future, future_to_key.pop(future)):
                         successful_transfers += 1
                     else:
                         failed_transfers += 1
-                except Exception as e:
-                    self.logger.error(f"Transfer task for {key} raised exception: {e}")
+                failed_deletions += self.delete_queued_from_s3()
+
+            # Process remaining transfers
+            for future in as_completed(future_to_key):
+                if self._transfer_succeeded(future, future_to_key[future]):
+                    successful_transfers += 1
+                else:
                     failed_transfers += 1
+                failed_deletions += self.delete_queued_from_s3()
+
+        self.part_executor.shutdown()
+        failed_deletions += self.delete_queued_from_s3(flush=True)
+
+        if not total_objects and not self.listing_failed:
+            self.logger.info("No objects found to transfer")
+            return
 
         # Summary
         self.logger.info("=" * 50)
         self.logger.info("TRANSFER SUMMARY")
         self.logger.info("=" * 50)
-        self.logger.info(f"Total objects: {len(objects)}")
+        self.logger.info(f"Total objects: {total_objects}")
         self.logger.info(f"Successful transfers: {successful_transfers}")
         self.logger.info(f"Failed transfers: {failed_transfers}")
+        if self.listing_failed:
+            self.logger.error("Listing incomplete: S3 listing failed, so some objects were not transferred")
+        if self.config.delete_from_s3:
+            self.logger.info(f"Failed S3 deletions: {failed_deletions}")
         self.logger.info(f"Action: {'Move' if self.config.delete_from_s3 else 'Copy'}")
 
 
@@ -218,6 +786,9 @@ def load_config() -> TransferConfig:
         # S3 settings
         s3_bucket=os.getenv("S3_BUCKET", ""),
         s3_prefix=os.getenv("S3_PREFIX", ""),
+        s3_prefix_is_directory=str_to_bool(os.getenv("S3_PREFIX_IS_DIRECTORY", "false")),
+        list_shards=[shard.strip() for shard in os.getenv("S3_LIST_SHARDS", "").split(",") if shard.strip()],
+        auto_shard_listing=str_to_bool(os.getenv("AUTO_SHARD_LISTING", "false")),
         aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),  # Can be None for default credentials
         aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),  # Can be None for default credentials
         aws_region=os.getenv("AWS_REGION", "us-east-1"),
@@ -230,6 +801,13 @@ def load_config() -> TransferConfig:
         max_workers=int(os.getenv("MAX_WORKERS", "5")),
         verify_checksums=str_to_bool(os.getenv("VERIFY_CHECKSUMS", "true")),
         skip_existing=str_to_bool(os.getenv("SKIP_EXISTING", "true")),
+        listing_cache_ttl=int(os.getenv("LISTING_CACHE_TTL", "0")),
+        log_level=os.getenv("LOG_LEVEL", "INFO"),
+        prefer_server_side_copy=str_to_bool(os.getenv("PREFER_SERVER_SIDE_COPY", "false")),
+        # Large object options
+        multipart_threshold=int(os.getenv("MULTIPART_THRESHOLD_MB", "64")) * MB,
+        multipart_chunksize=int(os.getenv("MULTIPART_CHUNKSIZE_MB", "16")) * MB,
+        part_workers=int(os.getenv("PART_WORKERS", "8")),
     )
 
     return config
@@ -253,6 +831,19 @@ def validate_config(config: TransferConfig) -> bool:
         print("\nPlease check your .env file or environment variables.")
         return False
 
+    # B2 rejects large file parts below its minimum size, other than the last part
+    if config.multipart_chunksize < B2_MIN_PART_SIZE:
+        print(f"Error: MULTIPART_CHUNKSIZE_MB must be at least {B2_MIN_PART_SIZE // MB}")
+        return False
+
+    if config.part_workers < 1:
+        print("Error: PART_WORKERS must be at least 1")
+        return False
+
+    if not isinstance(logging.getLevelName(config.log_level.upper()), int):
+        print(f"Error: LOG_LEVEL must be one of DEBUG, INFO, WARNING, ERROR or CRITICAL, not '{config.log_level}'")
+        return False
+
     return True
 
 
@@ -267,13 +858,17 @@ def main():
     # Display configuration (without sensitive data)
     print("Configuration loaded:")
     print(f"  S3 Bucket: {config.s3_bucket}")
-    print(f"  S3 Prefix: '{config.s3_prefix}'")
+    print(f"  S3 Prefix: '{directory_prefix(config.s3_prefix, config.s3_prefix_is_directory)}'")
     print(f"  AWS Region: {config.aws_region}")
     print(f"  B2 Bucket: {config.b2_bucket}")
     print(f"  Delete from S3: {config.delete_from_s3}")
     print(f"  Max Workers: {config.max_workers}")
     print(f"  Verify Checksums: {config.verify_checksums}")
     print(f"  Skip Existing: {config.skip_existing}")
+    print(f"  Prefer Server-Side Copy: {config.prefer_server_side_copy}")
+    print(f"  Multipart Threshold: {config.multipart_threshold // MB} MB")
+    print(f"  Multipart Chunk Size: {config.multipart_chunksize // MB} MB")
+    print(f"  Part Workers: {config.part_workers}")
     print()
 
     # Run transfer